@@ -1,4 +1,105 @@
+import weakref
+
 import numpy as np
+from numba import njit
+from scipy.sparse import csr_matrix, issparse
+
+def _as_csr(matrix):
+    """Return the transition matrix in CSR form, converting dense input once."""
+    return matrix.tocsr() if issparse(matrix) else csr_matrix(matrix)
+
+def sparsify(matrix, epsilon=1e-6):
+    """
+    Drop transitions whose probability is below epsilon and return a CSR matrix.
+    
+    The mass discarded per step is below epsilon for each pruned transition of a state,
+    so probabilities propagated over max_steps are accurate to about epsilon * max_steps.
+    
+    Args:
+        matrix: Transition probability matrix (dense or sparse)
+        epsilon: Transitions with probability below this value are removed
+        
+    Returns:
+        matrix: Pruned transition matrix in CSR form
+    """
+    matrix = _as_csr(matrix)
+    if epsilon > 0:
+        matrix = matrix.copy()
+        matrix.data[matrix.data < epsilon] = 0
+        matrix.eliminate_zeros()
+    return matrix
+
+def _transposed(matrix):
+    """
+    Return the transpose of a CSR matrix, itself stored as CSR.
+    
+    Propagating with transposed @ dist walks contiguous rows, whereas dist @ matrix
+    scatters into the output column by column.
+    """
+    return matrix.T.tocsr()
+
+def _fingerprint(matrix):
+    """
+    Return a cheap summary of the matrix contents (shape, stored entries and a hash of
+    their bytes), used to notice matrices modified in place.
+    """
+    if issparse(matrix):
+        if matrix.format not in ("csr", "csc", "bsr"):
+            matrix = matrix.tocsr()
+        return (matrix.format, matrix.shape, matrix.nnz, hash(matrix.data.tobytes()),
+                hash(matrix.indices.tobytes()), hash(matrix.indptr.tobytes()))
+    matrix = np.asarray(matrix)
+    return (matrix.shape, matrix.dtype.str, hash(matrix.tobytes()))
+
+# Results cached per matrix object: id(matrix) -> (weak reference, fingerprint, {key: result})
+_results_cache = {}
+
+def _memoized(matrix, key, compute):
+    """
+    Return compute() for this matrix and key, reusing the result of earlier calls.
+    
+    Entries are dropped when the matrix is garbage collected, and all results of a
+    matrix are recomputed once its contents have been modified in place.
+    """
+    matrix_id = id(matrix)
+    fingerprint = _fingerprint(matrix)
+    entry = _results_cache.get(matrix_id)
+    if entry is None or entry[0]() is not matrix or entry[1] != fingerprint:
+        ref = weakref.ref(matrix, lambda _: _results_cache.pop(matrix_id, None))
+        entry = _results_cache[matrix_id] = (ref, fingerprint, {})
+    results = entry[2]
+    if key not in results:
+        results[key] = compute()
+    return results[key]
+
+@njit(cache=True, fastmath=True)
+def _csr_matvec(indptr, indices, data, x, out):
+    """Compute out = A @ x for a CSR matrix A given by its indptr, indices and data arrays."""
+    for row in range(out.shape[0]):
+        total = 0.0
+        for k in range(indptr[row], indptr[row + 1]):
+            total += data[k] * x[indices[k]]
+        out[row] = total
+
+@njit(cache=True, fastmath=True)
+def _propagate_cumulative(sub_indptr, sub_indices, sub_data, in_indptr, in_indices, in_data,
+                          dist, first_step, max_steps, out):
+    """
+    Fill out[k, step] for first_step <= step <= max_steps with the probability of having
+    reached target k within step steps.
+    
+    Only the non-target states are propagated: sub_* is the transposed CSR block of
+    transitions among them and in_* the transposed CSR block of transitions from them
+    into the targets. dist is the distribution over non-target states before first_step.
+    """
+    next_dist = np.empty_like(dist)
+    arrivals = np.empty(out.shape[0], dtype=out.dtype)
+    for step in range(first_step, max_steps + 1):
+        _csr_matvec(in_indptr, in_indices, in_data, dist, arrivals)
+        for k in range(out.shape[0]):
+            out[k, step] = out[k, step - 1] + arrivals[k]
+        _csr_matvec(sub_indptr, sub_indices, sub_data, dist, next_dist)
+        dist, next_dist = next_dist, dist
 
 def analyze_predecessors(matrix, target_states, state_labels=None, threshold=0.01):
     """
@@ -15,27 +116,41 @@ def analyze_predecessors(matrix, target_states, state_labels=None, threshold=0.0
     """
     predecessors = {}
     
+    # Missing labels fall back to "State <id>"
+    state_labels = state_labels or {}
+    
+    # Sparse matrices are sliced column-wise, so convert them to CSC once
+    if issparse(matrix):
+        matrix = matrix.tocsc()
+    
     print("\nPredecessor Analysis for Target States:")
     print("======================================")
     
     for target in target_states:
-        target_label = state_labels.get(target, f"State {target}") if state_labels else f"State {target}"
+        target_label = state_labels.get(target, f"State {target}")
         print(f"\nTarget: {target_label} (State {target})")
         print("-" * (len(f"Target: {target_label} (State {target})")))
         
         # Find states that have a direct transition to this target
-        target_predecessors = []
-        
-        for source in range(matrix.shape[0]):
-            if matrix[source, target] >= threshold:
-                source_label = state_labels.get(source, f"State {source}") if state_labels else f"State {source}"
-                target_predecessors.append((source, source_label, matrix[source, target]))
+        # (one column slice instead of a per-source scalar lookup)
+        if issparse(matrix):
+            column = matrix[:, [target]].toarray().ravel()
+        else:
+            column = np.ascontiguousarray(matrix[:, target])
+        sources = np.flatnonzero(column >= threshold)
+        probs = column[sources]
         
-        # Sort by transition probability (highest first)
-        target_predecessors.sort(key=lambda x: x[2], reverse=True)
+        # Sort by transition probability (highest first, ties keep source order)
+        order = np.argsort(-probs, kind="stable")
+        sources, probs = sources[order], probs[order]
         
         # Store the predecessors
-        predecessors[target] = [(s, p) for s, _, p in target_predecessors]
+        predecessors[target] = list(zip(sources.tolist(), probs.tolist()))
+        
+        target_predecessors = []
+        for source, prob in predecessors[target]:
+            source_label = state_labels.get(source, f"State {source}")
+            target_predecessors.append((source, source_label, prob))
         
         # Print information about each predecessor
         if target_predecessors:
@@ -79,6 +194,9 @@ def plot_with_predecessors(time_series, cumulative_series, matrix, source, targe
     import plotly.express as px
     from plotly.subplots import make_subplots
     
+    # Missing labels fall back to "State <id>"
+    state_labels = state_labels or {}
+    
     # Create subplots
     fig = make_subplots(rows=2, cols=1, 
                         subplot_titles=("Step-by-Step Probability", "Cumulative Probability"),
@@ -90,7 +208,7 @@ def plot_with_predecessors(time_series, cumulative_series, matrix, source, targe
     
     # Add step-by-step traces
     for i, state in enumerate(target_states):
-        label = state_labels.get(state, f"State {state}") if state_labels else f"State {state}"
+        label = state_labels.get(state, f"State {state}")
         
         fig.add_trace(
             go.Scatter(
@@ -105,7 +223,7 @@ def plot_with_predecessors(time_series, cumulative_series, matrix, source, targe
     
     # Add cumulative traces for target states
     for state in target_states:
-        label = state_labels.get(state, f"State {state}") if state_labels else f"State {state}"
+        label = state_labels.get(state, f"State {state}")
         
         fig.add_trace(
             go.Scatter(
@@ -128,41 +246,39 @@ def plot_with_predecessors(time_series, cumulative_series, matrix, source, targe
     
     # Compute cumulative probabilities for predecessor states
     # Initialize step-by-step probabilities for each state
-    all_states = list(set([pred for target in target_states 
-                          for pred, _ in top_predecessors[target]]))
+    all_states = {pred for target in target_states for pred, _ in top_predecessors[target]}
     
     # Filter out targets that are already in our analysis
-    pred_states = [state for state in all_states if state not in target_states]
+    target_set = set(target_states)
+    pred_states = list(all_states - target_set)
     
     if pred_states:
         # Compute cumulative probabilities for predecessors using the original function
         pred_cumulative_series = compute_cumulative_probabilities(matrix, source, pred_states, max_steps)
         
+        # Parse each target color once; predecessors get progressively lighter shades
+        target_rgb = {target: (int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16))
+                      for target, color in target_colors.items()}
+        lightness_levels = [0.7 - (i * 0.2) for i in range(3)]
+        
         # Add predecessor traces to the cumulative plot
         for target in target_states:
-            target_label = state_labels.get(target, f"State {target}") if state_labels else f"State {target}"
-            color = target_colors[target]
+            target_label = state_labels.get(target, f"State {target}")
+            r0, g0, b0 = target_rgb[target]
             
             for i, (pred, prob) in enumerate(top_predecessors[target]):
-                if pred in target_states:
+                if pred in target_set:
                     continue  # Skip if it's already a target state
                     
-                pred_label = state_labels.get(pred, f"State {pred}") if state_labels else f"State {pred}"
+                pred_label = state_labels.get(pred, f"State {pred}")
                 
                 # Use lighter shade of the target color
-                lightness = 0.7 - (i * 0.2)
+                lightness = lightness_levels[i]
+                r = int(r0 + (255 - r0) * lightness)
+                g = int(g0 + (255 - g0) * lightness)
+                b = int(b0 + (255 - b0) * lightness)
                 
-                # Extract RGB components from hex color
-                r = int(color[1:3], 16)
-                g = int(color[3:5], 16)
-                b = int(color[5:7], 16)
-                
-                # Lighten the color
-                r = int(r + (255 - r) * lightness)
-                g = int(g + (255 - g) * lightness)
-                b = int(b + (255 - b) * lightness)
-                
-                pred_color = f"#{r:02x}{g:02x}{b:02x}"
+                pred_color = "#%02x%02x%02x" % (r, g, b)
                 
                 fig.add_trace(
                     go.Scatter(
@@ -199,74 +315,98 @@ def plot_with_predecessors(time_series, cumulative_series, matrix, source, targe
     
     return fig
 
+def _trajectory(matrix, source, max_steps, epsilon, dtype):
+    """
+    Return the distributions initial @ matrix^t for t = 0..max_steps as rows of one array.
+    """
+    def compute():
+        transposed = _transposed(sparsify(matrix, epsilon)).astype(dtype, copy=False)
+        trajectory = np.zeros((max_steps + 1, matrix.shape[0]), dtype=dtype)
+        trajectory[0, source] = 1.0
+        for step in range(1, max_steps + 1):
+            trajectory[step] = transposed @ trajectory[step - 1]
+        return trajectory
+    
+    return _memoized(matrix, ("trajectory", source, max_steps, epsilon, dtype), compute)
+
+def _cumulative_arrivals(matrix, source, targets, max_steps, epsilon, dtype):
+    """
+    Return the cumulative arrival probabilities of the sorted, unique targets as rows of one array.
+    """
+    def compute():
+        # Transition matrices are sparse, so each step is an O(nnz) mat-vec
+        sparse_matrix = sparsify(matrix, epsilon).astype(dtype, copy=False)
+        target_idx = np.asarray(targets, dtype=np.intp)
+        series = np.zeros((len(target_idx), max_steps + 1), dtype=dtype)
+        
+        # Initial state probability
+        initial_dist = np.zeros(matrix.shape[0], dtype=dtype)
+        initial_dist[source] = 1.0
+        
+        # Record initial state
+        series[:, 0] = initial_dist[target_idx]
+        
+        if max_steps >= 1:
+            # The first step leaves the source, which may itself be a target
+            first_dist = sparse_matrix[source].toarray().ravel()
+            series[:, 1] = series[:, 0] + first_dist[target_idx]
+            
+            # Probability that reaches a target is absorbed, so from then on only the
+            # non-target states need to be propagated
+            is_target = np.zeros(matrix.shape[0], dtype=bool)
+            is_target[target_idx] = True
+            non_targets = np.flatnonzero(~is_target)
+            from_non_targets = sparse_matrix[non_targets]
+            among = _transposed(from_non_targets[:, non_targets])
+            into_targets = _transposed(from_non_targets[:, target_idx])
+            
+            _propagate_cumulative(among.indptr, among.indices, among.data,
+                                  into_targets.indptr, into_targets.indices, into_targets.data,
+                                  first_dist[non_targets], 2, max_steps, series)
+        
+        return series
+    
+    return _memoized(matrix, ("cumulative", source, targets, max_steps, epsilon, dtype), compute)
+
 # Reuse the cumulative probability function from before
-def compute_cumulative_probabilities(matrix, source, target_states, max_steps):
+def compute_cumulative_probabilities(matrix, source, target_states, max_steps, epsilon=0.0,
+                                     dtype=np.float32):
     """
     Compute the cumulative probability of reaching each target state from the source.
     
+    Results are cached per matrix object, so repeating a call with the same (unmodified)
+    matrix, source, targets and max_steps only copies the stored series.
+    
+    Probabilities are propagated in float32 by default, which halves the memory traffic
+    per step and keeps about 7 significant digits; pass dtype=np.float64 for full precision.
+    
     Args:
         matrix: Transition probability matrix
         source: Source state (typically 0)
         target_states: List of target states to analyze
         max_steps: Maximum number of steps to compute
+        epsilon: Transitions below this probability are pruned (see sparsify)
+        dtype: Floating point type used for the propagation and the returned arrays
         
     Returns:
         cumulative_series: Dictionary with state IDs as keys and cumulative probability arrays as values
     """
-    n_states = matrix.shape[0]
-    
-    # Initialize cumulative series for each target state
-    cumulative_series = {state: np.zeros(max_steps + 1) for state in target_states}
-    
-    # Initial state probability
-    initial_dist = np.zeros(n_states)
-    initial_dist[source] = 1.0
+    targets = tuple(sorted(set(target_states)))
+    series = _cumulative_arrivals(matrix, source, targets, max_steps, epsilon, np.dtype(dtype))
     
-    # Distribution of probability that hasn't yet reached any target
-    active_dist = initial_dist.copy()
+    # Copy the requested rows so callers never share the cached array
+    row_of = {state: i for i, state in enumerate(targets)}
+    selected = series[[row_of[state] for state in target_states]]
     
-    # Record initial state
-    for state in target_states:
-        if state == source:
-            cumulative_series[state][0] = 1.0
-    
-    # For each step
-    for step in range(1, max_steps + 1):
-        # Copy previous cumulative probabilities
-        for state in target_states:
-            cumulative_series[state][step] = cumulative_series[state][step-1]
-        
-        # Move active distribution forward one step
-        next_dist = np.dot(active_dist, matrix)
-        
-        # For each target state, add newly arrived probability
-        for state in target_states:
-            # Add new probability to cumulative
-            new_arrival = next_dist[state]
-            cumulative_series[state][step] += new_arrival
-            
-            # Remove this probability from active distribution to avoid counting it again
-            next_dist[state] = 0
-        
-        # Update active distribution for next iteration
-        active_dist = next_dist
-    
-    return cumulative_series
+    return {state: selected[i] for i, state in enumerate(target_states)}
 
 # First compute step-by-step and cumulative probabilities for targets
 print("Computing probabilities for target states...")
 
 # Step-by-step probabilities
-def compute_step_by_step_probabilities(matrix, source, target_states, max_steps):
-    n_states = matrix.shape[0]
-    time_series = {state: np.zeros(max_steps + 1) for state in target_states}
-    initial_dist = np.zeros(n_states)
-    initial_dist[source] = 1.0
-    for state in target_states:
-        time_series[state][0] = initial_dist[state]
-    current_dist = initial_dist.copy()
-    for step in range(1, max_steps + 1):
-        current_dist = np.dot(current_dist, matrix)
-        for state in target_states:
-            time_series[state][step] = current_dist[state]
-    return time_series
+def compute_step_by_step_probabilities(matrix, source, target_states, max_steps, epsilon=0.0,
+                                       dtype=np.float32):
+    # float32 by default, as in compute_cumulative_probabilities
+    target_idx = np.asarray(target_states, dtype=np.intp)
+    series = _trajectory(matrix, source, max_steps, epsilon, np.dtype(dtype))[:, target_idx].T
+    return {state: series[i] for i, state in enumerate(target_states)}
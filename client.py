@@ -1,8 +1,18 @@
 import random
+from bisect import bisect_left
+from itertools import accumulate
+
+import numpy as np
 
 class Client:
     # The client is the one who places the order
     
+    __slots__ = (
+        "state", "_priority_distribution", "_priorities", "_cdf", "order_penalties",
+        "time_passed", "order_quantity", "current_payment", "current_priority",
+        "time_limit", "in_time_payment", "out_of_time_payment"
+    )
+    
     def __init__(self, priority_distribution={"low": 0.4, "medium": 0.5, "high": 0.1}, 
                  order_penalties={"low": (20, 5, 1), "medium": (15, 10, 2), "high": (10, 15, 1)}):
         """
@@ -23,6 +33,18 @@ class Client:
         self.in_time_payment = None
         self.out_of_time_payment = None
     
+    @property
+    def priority_distribution(self):
+        """Distribution of order priorities used by place_order"""
+        return self._priority_distribution
+    
+    @priority_distribution.setter
+    def priority_distribution(self, distribution):
+        # Precompute the cumulative distribution once so sampling is a binary search
+        self._priority_distribution = distribution
+        self._priorities = list(distribution.keys())
+        self._cdf = list(accumulate(distribution.values()))
+    
     def place_order(self):
         """
         Place a new order with priority selected according to the distribution.
@@ -32,15 +54,10 @@ class Client:
             raise ValueError("Cannot place an order when not in idle state")
         
         # Select a priority based on the probability distribution
-        rand_val = random.random()
-        cumulative_prob = 0
+        # (the last priority absorbs rounding when the probabilities sum slightly below 1)
+        index = bisect_left(self._cdf, random.random())
+        self.current_priority = self._priorities[min(index, len(self._priorities) - 1)]
         
-        for priority, prob in self.priority_distribution.items():
-            cumulative_prob += prob
-            if rand_val <= cumulative_prob:
-                self.current_priority = priority
-                break
-                
         # Set order parameters based on priority
         self.time_limit, self.in_time_payment, self.out_of_time_payment = self.order_penalties[self.current_priority]
         
@@ -52,6 +69,25 @@ class Client:
         
         return self.current_priority
     
+    def place_order_batch(self, n, rng=None):
+        """
+        Sample the priorities of n independent orders in one vectorized draw.
+        The client's own state is left unchanged.
+        
+        Args:
+            n: Number of orders to sample
+            rng: Optional numpy Generator (a fresh default_rng() is used if omitted)
+        
+        Returns:
+            Array of n priorities
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        
+        index = np.searchsorted(self._cdf, rng.random(n), side="left")
+        priorities = np.asarray(self._priorities, dtype=object)
+        return priorities[np.minimum(index, len(priorities) - 1)]
+    
     def quantity_shipped(self, quantity):
         """
         Record quantity shipped and calculate payment.
@@ -88,6 +124,16 @@ class Client:
             
         return payment
     
+    def can_receive(self, quantity):
+        """
+        Check whether quantity_shipped(quantity) would be accepted.
+        
+        Args:
+            quantity: Amount to be shipped
+        """
+        return (self.state in ["order_placed", "wait_for_completion"]
+                and quantity > 0 and self.order_quantity + quantity <= 1)
+    
     def step_time(self):
         """
         Advances time by one unit.
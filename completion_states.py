@@ -1,4 +1,7 @@
-import networkx as nx
+import re
+
+# Node definition whose label starts with "Completed", e.g. s12 [label="Completed True medium"]
+_COMPLETED_NODE_RE = re.compile(r'^\s*(\w+)\s*\[[^\]]*label="Completed\s+([^\s"]+)\s+([^\s"]+)', re.MULTILINE)
 
 def generate_completion_state_labels(dot_file_path):
     """
@@ -7,36 +10,32 @@ def generate_completion_state_labels(dot_file_path):
     
     Args:
         dot_file_path (str): Path to the DOT file containing the MDP
-        
+    
     Returns:
         dict: Dictionary mapping state IDs to descriptive labels
     """
-    # Read the DOT file and create a directed graph
-    G = nx.DiGraph(nx.nx_pydot.read_dot(dot_file_path))
+    # Read the raw DOT text; completion states are found with a single regex scan
+    with open(dot_file_path, 'r') as f:
+        content = f.read()
     
     # Initialize the state labels dictionary
     state_labels = {}
     
     # Find all completion states
-    for node, attrs in G.nodes(data=True):
-        label = attrs.get('label', '').strip('"')
+    # Format is typically: "Completed True medium" or "Completed False high"
+    for match in _COMPLETED_NODE_RE.finditer(content):
+        node, success_str, priority = match.group(1, 2, 3)
+        
+        # Extract success/failure indicator
+        success = success_str == "True"
+        
+        # Create descriptive label: "On Time/Late priority Priority"
+        descriptive_label = f"{'On Time' if success else 'Late'} {priority.capitalize()} Priority"
+        
+        # Extract state ID number (remove the 's' prefix)
+        state_id = node.lstrip('s')
         
-        # Check if this is a completion state
-        if label.startswith('Completed'):
-            # Format is typically: "Completed True medium" or "Completed False high"
-            parts = label.split()
-            if len(parts) >= 3:
-                # Extract success/failure indicator and priority
-                success = parts[1] == "True"
-                priority = parts[2] if len(parts) >= 3 else "unknown"
-                
-                # Create descriptive label: "On Time/Late priority Priority"
-                descriptive_label = f"{'On Time' if success else 'Late'} {priority.capitalize()} Priority"
-                
-                # Extract state ID number (remove the 's' prefix)
-                state_id = node.lstrip('s')
-                
-                # Add to state labels dictionary
-                state_labels[state_id] = descriptive_label
+        # Add to state labels dictionary
+        state_labels[state_id] = descriptive_label
     
     return state_labels
\ No newline at end of file
@@ -0,0 +1,403 @@
+import heapq
+import random
+from itertools import count
+from multiprocessing import Pool
+
+import numpy as np
+from numba import njit
+
+from machine import Machine
+from truck import AVAILABLE, DELIVERING, STATE_NAMES
+
+@njit(cache=True, nogil=True)
+def advance_fleet(delivering, n_delivering, state, time_remaining, current_load, client_id,
+                  shipped, delivered):
+    """
+    Advance by one time unit the trucks listed in delivering[:n_delivering] in place:
+    they count down, and those reaching 0 add their load to shipped[client_id] and
+    become available. The trucks still delivering are compacted in place at the front
+    of delivering and those that delivered are written to delivered.
+    Returns the new number of delivering trucks and the number of deliveries.
+    
+    Fleet.step calls this once per time unit. The GIL is released, so threads may
+    advance disjoint fleets concurrently as long as they do not share a shipped array.
+    """
+    n_kept = 0
+    n_delivered = 0
+    for k in range(n_delivering):
+        i = delivering[k]
+        time_remaining[i] = max(time_remaining[i] - 1, 0)
+        finished = time_remaining[i] == 0
+        
+        # Only finished trucks touch their client's total, so trucks of the same
+        # client do not all write to one shipped entry every step
+        if finished:
+            shipped[client_id[i]] += current_load[i]
+        
+        # Masked transition: DELIVERING - 1 == AVAILABLE and the load is zeroed, so
+        # trucks that did not finish are left as they are without a branch
+        state[i] -= finished
+        current_load[i] *= 1 - finished
+        
+        # Write the index to both lists and advance only the one it belongs to
+        delivered[n_delivered] = i
+        n_delivered += finished
+        delivering[n_kept] = i
+        n_kept += 1 - finished
+    return n_kept, n_delivered
+
+class Fleet:
+    """
+    Class representing many trucks stored as arrays (one entry per truck) so the
+    whole fleet is advanced by one compiled loop per time unit.
+    Each truck behaves like a Truck; deliveries are accumulated per client.
+    """
+    def __init__(self, capacities, times_to_deliver, client_ids=None, n_clients=None, names=None,
+                 clients=None):
+        """
+        Initialize a fleet of available, empty trucks.
+        
+        Args:
+            capacities: Maximum load capacity of each truck
+            times_to_deliver: Time units required for a full delivery cycle
+                              (a single value or one per truck)
+            client_ids: Index of the client each truck delivers to (all 0 if omitted)
+            n_clients: Number of clients (one more than the largest client index if omitted)
+            names: Optional name identifiers for the trucks
+            clients: Optional Client objects, indexed by client index, to report deliveries to
+        """
+        # Capacities and loads stay in double precision: in float32 a capacity of 1/3
+        # rounds up, and three such deliveries exceed the full order a client accepts
+        self.capacity = np.asarray(capacities, dtype=np.float64)
+        n_trucks = len(self.capacity)
+        self.time_to_deliver = np.broadcast_to(np.asarray(times_to_deliver, dtype=np.int32), n_trucks).copy()
+        self.names = list(names) if names is not None else [f"Truck-{capacity}" for capacity in capacities]
+        
+        # Client of each truck and total quantity delivered to each client
+        if client_ids is None:
+            self.client_id = np.zeros(n_trucks, dtype=np.intp)
+        else:
+            self.client_id = np.asarray(client_ids, dtype=np.intp)
+        if n_clients is None:
+            if clients is not None:
+                n_clients = len(clients)
+            else:
+                n_clients = int(self.client_id.max()) + 1 if n_trucks else 1
+        
+        # The compiled step does no bounds checking, so every index is checked here
+        if len(self.client_id) != n_trucks:
+            raise ValueError(f"Expected {n_trucks} client ids, got {len(self.client_id)}")
+        if n_trucks and (self.client_id.min() < 0 or self.client_id.max() >= n_clients):
+            raise ValueError(f"Client ids must be between 0 and {n_clients - 1}")
+        if clients is not None and len(clients) != n_clients:
+            raise ValueError(f"Expected {n_clients} clients, got {len(clients)}")
+        self.shipped = np.zeros(n_clients, dtype=np.float64)
+        
+        # Client objects and the part of shipped already reported to them
+        self.clients = list(clients) if clients is not None else None
+        self.reported = np.zeros(n_clients, dtype=np.float64)
+        
+        # State tracking
+        self.state = np.full(n_trucks, AVAILABLE, dtype=np.uint8)  # AVAILABLE or DELIVERING
+        self.current_load = np.zeros(n_trucks, dtype=np.float64)
+        self.time_remaining = np.zeros(n_trucks, dtype=np.int32)
+        
+        # Indices of the delivering trucks (the first n_delivering entries), so a step
+        # never scans the available ones; kept up to date by the request methods
+        self.delivering = np.empty(n_trucks, dtype=np.intp)
+        self.n_delivering = 0
+    
+    def __len__(self):
+        return len(self.state)
+    
+    def request_shipment(self, truck, machine):
+        """
+        Attempt to start a shipment from the given machine on one truck.
+        Returns True if shipment started, False otherwise.
+        
+        Args:
+            truck: Index of the truck in the fleet
+            machine: Machine that will be the source of products
+        """
+        if self.state[truck] != AVAILABLE:
+            return False
+        
+        # Retrieve product from the machine (up to capacity)
+        retrieved_quantity = machine.retrieve_quantity(float(self.capacity[truck]))
+        
+        if retrieved_quantity <= 0:
+            return False
+        
+        # Start shipment
+        self.current_load[truck] = retrieved_quantity
+        self.state[truck] = DELIVERING
+        self.time_remaining[truck] = self.time_to_deliver[truck]
+        self.delivering[self.n_delivering] = truck
+        self.n_delivering += 1
+        return True
+    
+    def request_shipments(self, machine):
+        """
+        Attempt to start a shipment from the given machine on every available truck,
+        with a single batched retrieval (trucks are served in index order).
+        Returns the indices of the trucks whose shipment started.
+        
+        Args:
+            machine: Machine that will be the source of products
+        """
+        available = np.flatnonzero(self.state == AVAILABLE)
+        if len(available) == 0:
+            return available
+        
+        # Retrieve product from the machine (up to each truck's capacity)
+        retrieved = machine.retrieve_quantities(self.capacity[available])
+        started = available[retrieved > 0]
+        
+        # Start shipments
+        self.current_load[started] = retrieved[retrieved > 0]
+        self.state[started] = DELIVERING
+        self.time_remaining[started] = self.time_to_deliver[started]
+        self.delivering[self.n_delivering:self.n_delivering + len(started)] = started
+        self.n_delivering += len(started)
+        return started
+    
+    def step(self):
+        """
+        Advance every truck by one time unit (only the delivering ones are visited).
+        Returns the indices of the trucks that performed a delivery during this step.
+        """
+        delivered = np.empty(self.n_delivering, dtype=np.intp)
+        self.n_delivering, n_delivered = advance_fleet(
+            self.delivering, self.n_delivering, self.state, self.time_remaining,
+            self.current_load, self.client_id, self.shipped, delivered
+        )
+        
+        # Hand the deliveries of this step over to the client objects, if any
+        if self.clients is not None:
+            self.sync_clients()
+        return delivered[:n_delivered]
+    
+    def sync_clients(self):
+        """
+        Report to each client object the quantity delivered to it since the last report,
+        with one quantity_shipped call per client that received something.
+        Each client is sent as much as its order still accepts (see Client.can_receive);
+        the rest stays pending for a later report.
+        """
+        for client_index in np.flatnonzero(self.shipped != self.reported):
+            client = self.clients[client_index]
+            pending = float(self.shipped[client_index] - self.reported[client_index])
+            quantity = min(pending, 1 - client.order_quantity)
+            if client.can_receive(quantity):
+                client.quantity_shipped(quantity)
+                self.reported[client_index] += quantity
+    
+    def get_state(self, truck):
+        """
+        Return the current state of one truck, in the same form as Truck.get_state().
+        
+        Args:
+            truck: Index of the truck in the fleet
+        """
+        return {
+            "name": self.names[truck],
+            "state": STATE_NAMES[self.state[truck]],
+            "capacity": float(self.capacity[truck]),
+            "current_load": float(self.current_load[truck]),
+            "time_remaining": int(self.time_remaining[truck])
+        }
+    
+    def is_available(self):
+        """Return a boolean array telling which trucks are available for a new shipment"""
+        return self.state == AVAILABLE
+    
+    def reset(self):
+        """Reset every truck to its initial state and clear the delivered quantities"""
+        self.state[:] = AVAILABLE
+        self.current_load[:] = 0
+        self.time_remaining[:] = 0
+        self.shipped[:] = 0
+        self.reported[:] = 0
+        self.n_delivering = 0
+
+class FleetLogger:
+    """
+    Class recording the history of a Fleet in preallocated arrays: one row of truck
+    states and one row of loads per recorded time unit, instead of a list of
+    per-truck get_state() dicts.
+    """
+    def __init__(self, fleet, n_steps):
+        """
+        Initialize an empty history with room for n_steps records.
+        
+        Args:
+            fleet: Fleet to record
+            n_steps: Maximum number of records (usually the length of the run)
+        """
+        self.fleet = fleet
+        self.state_log = np.empty((n_steps, len(fleet)), dtype=np.uint8)
+        self.load_log = np.empty((n_steps, len(fleet)), dtype=np.float32)
+        self.n_records = 0
+    
+    def record(self):
+        """
+        Append the current state and load of every truck as the next row.
+        Raises IndexError once n_steps records have been made.
+        """
+        self.state_log[self.n_records] = self.fleet.state
+        self.load_log[self.n_records] = self.fleet.current_load
+        self.n_records += 1
+    
+    def states(self):
+        """Return the recorded truck states, one row per record"""
+        return self.state_log[:self.n_records]
+    
+    def loads(self):
+        """Return the recorded truck loads, one row per record"""
+        return self.load_log[:self.n_records]
+    
+    def reset(self):
+        """Forget all records (the arrays are kept for reuse)"""
+        self.n_records = 0
+
+class DeliveryScheduler:
+    """
+    Event-driven scheduler for Truck objects: instead of stepping every truck one
+    time unit at a time, each shipment schedules its completion and the clock
+    jumps straight to the next completion.
+    """
+    def __init__(self):
+        """Initialize a scheduler at time 0 with no pending deliveries"""
+        self.now = 0
+        self._events = []  # heap of (completion time, sequence number, truck)
+        self._sequence = count()
+    
+    def request_shipment(self, truck):
+        """
+        Attempt to start a shipment on a truck and schedule its completion.
+        Returns True if shipment started, False otherwise.
+        
+        Args:
+            truck: Truck with its machine and client already set
+        """
+        if not truck.request_shipment():
+            return False
+        
+        # The sequence number keeps deliveries ending together in request order
+        heapq.heappush(self._events, (self.now + truck.time_to_deliver, next(self._sequence), truck))
+        return True
+    
+    def next_event_time(self):
+        """Return the time of the next delivery completion, or None if nothing is pending"""
+        return self._events[0][0] if self._events else None
+    
+    def advance_to_next_event(self):
+        """
+        Move the clock to the next delivery completion and complete every delivery due then.
+        Returns the list of trucks that delivered (empty if nothing is pending).
+        """
+        if not self._events:
+            return []
+        return self.advance_to(self._events[0][0])
+    
+    def advance_to(self, time):
+        """
+        Complete every delivery due up to the given time and move the clock there.
+        Returns the list of trucks that delivered, in completion order.
+        
+        Args:
+            time: New value of the clock (not earlier than the current one)
+        """
+        delivered = []
+        while self._events and self._events[0][0] <= time:
+            event_time, _, truck = self._events[0]
+            self.now = event_time
+            
+            # The event is dropped only once the client has accepted the delivery
+            truck.complete_delivery()
+            heapq.heappop(self._events)
+            delivered.append(truck)
+        
+        self.now = max(self.now, time)
+        return delivered
+    
+    def reset(self):
+        """Drop all pending deliveries and move the clock back to 0"""
+        self.now = 0
+        self._events.clear()
+        self._sequence = count()
+
+def simulate_one(seed, capacity, time_to_deliver, n_steps, n_trucks=1):
+    """
+    Run one replication: a machine producing full batches continuously and a fleet
+    of identical trucks shipping its output whenever they are available.
+    
+    Args:
+        seed: Seed of the random generator used by the machine
+        capacity: Maximum load capacity of each truck
+        time_to_deliver: Time units required for a full delivery cycle
+        n_steps: Number of time units to simulate
+        n_trucks: Number of trucks in the fleet
+    
+    Returns:
+        dict: Parameters of the run with the quantity shipped, the number of
+              deliveries and the fraction of truck time spent delivering
+    """
+    random.seed(seed)
+    machine = Machine(name="M")
+    fleet = Fleet([capacity] * n_trucks, time_to_deliver)
+    deliveries = 0
+    busy_time = 0
+    
+    for _ in range(n_steps):
+        # Keep the machine busy with full batches
+        if machine.is_idle():
+            machine.request_processing(batch_size="full")
+        machine.step()
+        
+        # Load every available truck the stored output allows
+        fleet.request_shipments(machine)
+        
+        # Advance the delivering trucks with one kernel call
+        busy_time += fleet.n_delivering
+        deliveries += len(fleet.step())
+    
+    return {
+        "seed": seed,
+        "capacity": capacity,
+        "time_to_deliver": time_to_deliver,
+        "n_steps": n_steps,
+        "n_trucks": n_trucks,
+        "shipped": float(fleet.shipped.sum()),
+        "deliveries": int(deliveries),
+        "utilization": float(busy_time / (n_steps * n_trucks)) if n_steps and n_trucks else 0.0
+    }
+
+def _simulate_task(task):
+    """Run simulate_one with the keyword arguments of one task (picklable for Pool.map)"""
+    return simulate_one(**task)
+
+def run_replications(n, params, processes=None):
+    """
+    Run independent replications of simulate_one in parallel worker processes.
+    
+    Args:
+        n: Number of replications (seeds 0 to n-1) for each parameter set
+        params: Keyword arguments of simulate_one except the seed, or a list of
+                them to sweep several parameter sets
+        processes: Number of worker processes (os.cpu_count() if None)
+    
+    Returns:
+        dict: Mapping from each result field to the list of its values, one per
+              replication, parameter sets in order
+    """
+    if isinstance(params, dict):
+        params = [params]
+    tasks = [dict(parameter_set, seed=seed) for parameter_set in params for seed in range(n)]
+    
+    # Replications share no state, so they run in separate processes
+    with Pool(processes) as pool:
+        results = pool.map(_simulate_task, tasks)
+    
+    # Gather the per-run metrics by field
+    return {key: [result[key] for result in results] for key in results[0]} if results else {}
\ No newline at end of file
@@ -1,11 +1,29 @@
 
 import random
+from bisect import bisect_right
+from itertools import accumulate
+
+import numpy as np
+
+# Fraction of a full batch for each batch size (also the raw material it needs)
+_BATCH_FRACTIONS = {"full": 1.0, "half": 0.5, "third": 1/3}
+# Leftovers smaller than this (float residue of earlier retrievals) are not handed out
+_QUANTITY_TOLERANCE = 1e-9
+# Fraction reported for the batch in progress (integral when idle or full, as reported before)
+_REPORTED_FRACTIONS = {None: 0, "full": 1, "half": 0.5, "third": 1/3}
 
 class Machine:
     """
     Class representing a manufacturing machine that can process materials,
     undergo maintenance, and produce output.
     """
+    __slots__ = (
+        "name", "processing_times", "success_probabilities", "maintenance_effect",
+        "maintenance_time", "maintenance_operator_cost", "_outcome_tables",
+        "state", "current_batch_size", "time_remaining", "stored_output", "source_machine",
+        "raw_material_consumed", "maintenance_active", "total_operator_time"
+    )
+    
     def __init__(self, 
                  name,
                  processing_times={"full": 3, "half": 2, "third": 1},
@@ -39,6 +57,15 @@ class Machine:
         self.maintenance_time = maintenance_time
         self.maintenance_operator_cost = maintenance_operator_cost
         
+        # Outcomes and cumulative weights per (regime, batch size), built once
+        self._outcome_tables = {}
+        for regime, distributions in (("normal", success_probabilities), ("maint", maintenance_effect)):
+            for batch_size, probabilities in distributions.items():
+                self._outcome_tables[(regime, batch_size)] = (
+                    tuple(probabilities.keys()),
+                    tuple(accumulate(probabilities.values()))
+                )
+        
         # State tracking
         self.state = "idle"  # idle, processing, maintenance
         self.current_batch_size = None
@@ -62,6 +89,26 @@ class Machine:
         self.stored_output -= quantity
         return quantity
     
+    def retrieve_quantities(self, max_quantities):
+        """
+        Retrieve output for several requests at once, served in order like successive
+        retrieve_quantity calls (up to float rounding, since the shares are computed
+        from a running sum). Shares below a small tolerance, such as the float residue
+        left by earlier retrievals, are returned as 0 and stay in the stored output.
+        Returns the array of quantities actually retrieved.
+        
+        Args:
+            max_quantities: Array of maximum quantities, one per request
+        """
+        max_quantities = np.asarray(max_quantities, dtype=np.float64)
+        
+        # Each request gets what is left once the previous ones took their share
+        requested_before = np.cumsum(max_quantities) - max_quantities
+        quantities = np.clip(self.stored_output - requested_before, 0, max_quantities)
+        quantities[quantities < _QUANTITY_TOLERANCE] = 0
+        self.stored_output -= float(quantities.sum())
+        return quantities
+    
     def request_maintenance(self):
         """
         Attempt to start maintenance if the machine is idle.
@@ -91,7 +138,7 @@ class Machine:
             raise ValueError(f"Invalid batch size: {batch_size}")
         
         # Determine raw material needs
-        raw_material_needed = {"full": 1.0, "half": 0.5, "third": 1/3}[batch_size]
+        raw_material_needed = _BATCH_FRACTIONS[batch_size]
         
         # Check if source machine has enough material (if there is a source)
         if self.source_machine:
@@ -108,6 +155,11 @@ class Machine:
         self.time_remaining = self.processing_times[batch_size]
         return True
     
+    @property
+    def current_batch_fraction(self):
+        """Fraction of a full batch being processed (0 when not processing)"""
+        return _REPORTED_FRACTIONS[self.current_batch_size]
+    
     def step(self):
         """
         Advance the machine's state by one time unit.
@@ -120,17 +172,16 @@ class Machine:
             
             if self.time_remaining <= 0:
                 # Processing complete, determine outcome
-                probabilities = self.maintenance_effect[self.current_batch_size] if self.maintenance_active else self.success_probabilities[self.current_batch_size]
+                regime = "maint" if self.maintenance_active else "normal"
+                outcomes, cum_weights = self._outcome_tables[(regime, self.current_batch_size)]
                 
-                outcomes = list(probabilities.keys())
-                probs = list(probabilities.values())
-                
-                # Select outcome based on probabilities
-                outcome = random.choices(outcomes, weights=probs, k=1)[0]
+                # Select outcome based on probabilities (same draw as random.choices)
+                rand_val = random.random() * cum_weights[-1]
+                outcome = outcomes[bisect_right(cum_weights, rand_val, 0, len(outcomes) - 1)]
                 
                 # Add output based on outcome
                 if outcome != "none":
-                    output_quantity = {"full": 1.0, "half": 0.5, "third": 1/3}[outcome]
+                    output_quantity = _BATCH_FRACTIONS[outcome]
                     self.stored_output += output_quantity
                 
                 # Reset state
@@ -149,6 +200,37 @@ class Machine:
         
         return completed
     
+    def sample_outcomes_batch(self, batch_sizes, maintenance_active, rng=None):
+        """
+        Sample the outcomes of many independent batch completions at once.
+        The machine's own state is left unchanged.
+        
+        Args:
+            batch_sizes: Array of batch sizes ("full", "half" or "third"), one per completion
+            maintenance_active: Boolean array (or scalar) telling which completions use
+                                the post-maintenance probabilities
+            rng: Optional numpy Generator (a fresh default_rng() is used if omitted)
+        
+        Returns:
+            Array of outcomes ("full", "half", "third" or "none"), one per completion
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        
+        batch_sizes = np.asarray(batch_sizes)
+        maintenance_active = np.broadcast_to(np.asarray(maintenance_active, dtype=bool), batch_sizes.shape)
+        rand_vals = rng.random(batch_sizes.shape)
+        result = np.empty(batch_sizes.shape, dtype=object)
+        
+        # One vectorized search per (regime, batch size) group
+        for (regime, batch_size), (outcomes, cum_weights) in self._outcome_tables.items():
+            group = (batch_sizes == batch_size) & (maintenance_active == (regime == "maint"))
+            if group.any():
+                index = np.searchsorted(cum_weights, rand_vals[group] * cum_weights[-1], side="right")
+                result[group] = np.asarray(outcomes, dtype=object)[np.minimum(index, len(outcomes) - 1)]
+        
+        return result
+    
     def get_state(self):
         """Return the current state of the machine"""
         return {
@@ -1,6 +1,19 @@
+import mmap
+import os
 import re
 import numpy as np
-import pandas as pd
+from scipy.sparse import coo_matrix, issparse
+
+# Patterns used on every line of a DOT file, compiled once
+_EDGE_BRE = re.compile(rb's(\d+)\s+->\s+s(\d+)')
+_NODE_ID_BRE = re.compile(rb's(\d+)')
+_DIGRAPH_BRE = re.compile(rb'\s*digraph')
+# Node definitions must start a statement so the target of an edge is never taken for one
+_NODE_DEF_BRE = re.compile(rb'(?:^|[;{])\s*s(\d+)\s+\[label="([^"]*)"\]', re.MULTILINE)
+_EDGE_LABEL_BRE = re.compile(rb's(\d+)\s+->\s+s(\d+)\s+\[label="run:([0-9.]+)"\]')
+
+# Record layout of the transitions returned by parse_dot_file
+_TRANSITION_DTYPE = np.dtype([("source", np.intp), ("target", np.intp), ("probability", np.float64)])
 
 
 def filter_dot_file(input_file, target_states):
@@ -15,63 +28,61 @@ def filter_dot_file(input_file, target_states):
     Returns:
         filtered_dot: String containing the filtered DOT content
     """
-    # Read the original DOT file
-    with open(input_file, 'r') as f:
-        content = f.readlines()
-    
-    # First pass: identify predecessors of target states
-    predecessors = set()
-    target_set = set(target_states)
-    
-    for line in content:
-        if "->" in line:  # This is an edge line
-            # Extract source and target
-            edge_match = re.search(r's(\d+)\s+->\s+s(\d+)', line)
-            if edge_match:
-                source = int(edge_match.group(1))
-                target = int(edge_match.group(2))
-                
-                # If this edge leads to a target state, the source is a predecessor
-                if target in target_set:
-                    predecessors.add(source)
-    
-    # Combine targets and predecessors
-    nodes_to_keep = target_set.union(predecessors)
-    
-    # Second pass: keep relevant lines
-    filtered_lines = []
-    
-    # Always keep the header line
-    filtered_lines.append("digraph filtered_mdp {\n")
-    
-    for line in content:
-        line = line.strip()
+    # Stream the original DOT file; only line offsets are remembered, never the content
+    with open(input_file, 'rb') as f:
+        # First pass: classify each line once as a node (source, None, offset)
+        # or an edge (source, target, offset), keeping the original order
+        parsed_lines = []
+        offset = 0
         
-        # Skip digraph opening and closing lines
-        if line.startswith("digraph") or line == "{" or line == "}":
-            continue
+        for line in f:
+            line_offset = offset
+            offset += len(line)
             
-        # Check if this is a node definition
-        if "->" not in line and "[label=" in line:
-            node_match = re.search(r's(\d+)', line)
-            if node_match and int(node_match.group(1)) in nodes_to_keep:
-                filtered_lines.append(line + "\n")
-                
-        # Check if this is an edge definition
-        elif "->" in line:
-            edge_match = re.search(r's(\d+)\s+->\s+s(\d+)', line)
-            if edge_match:
-                source = int(edge_match.group(1))
-                target = int(edge_match.group(2))
-                
-                # Keep edges between nodes we're interested in
-                if source in nodes_to_keep and target in nodes_to_keep:
-                    filtered_lines.append(line + "\n")
-    
-    # Add closing bracket
-    filtered_lines.append("}\n")
+            # Cheap byte tests on the raw line; nothing is decoded or stripped here.
+            # Brace lines match neither test and the digraph header is skipped.
+            # Check if this is an edge definition
+            if b"->" in line:
+                edge_match = _EDGE_BRE.search(line)
+                if edge_match and not _DIGRAPH_BRE.match(line):
+                    parsed_lines.append((int(edge_match.group(1)), int(edge_match.group(2)), line_offset))
+                    
+            # Check if this is a node definition
+            elif b"[label=" in line:
+                node_match = _NODE_ID_BRE.search(line)
+                if node_match and not _DIGRAPH_BRE.match(line):
+                    parsed_lines.append((int(node_match.group(1)), None, line_offset))
+        
+        # Node IDs are small dense integers (s0..sN), so membership is kept in
+        # bytearrays indexed by ID instead of hashed sets
+        target_set = set(target_states)
+        max_id = max([source for source, _, _ in parsed_lines]
+                     + [target for _, target, _ in parsed_lines if target is not None]
+                     + list(target_set), default=-1)
+        is_target = bytearray(max_id + 1)
+        for target in target_set:
+            is_target[target] = 1
+        
+        # Combine targets and predecessors (the source of an edge leading to a target state)
+        keep = bytearray(is_target)
+        for source, target, _ in parsed_lines:
+            if target is not None and is_target[target]:
+                keep[source] = 1
+        
+        # Second pass: re-read only the nodes we're interested in and the edges between them
+        kept_lines = [b"digraph filtered_mdp {"]
+        
+        for source, target, line_offset in parsed_lines:
+            if keep[source] and (target is None or keep[target]):
+                f.seek(line_offset)
+                kept_lines.append(f.readline().strip())
+        
+        # Add closing bracket (and the final newline)
+        kept_lines.append(b"}")
+        kept_lines.append(b"")
     
-    return "".join(filtered_lines)
+    # Join the stripped lines once and decode the result a single time
+    return b"\n".join(kept_lines).decode()
 
 def parse_dot_file(file_path):
     """
@@ -82,43 +93,24 @@ def parse_dot_file(file_path):
         
     Returns:
         nodes: Dictionary mapping node IDs to labels
-        transitions: List of tuples (source, target, probability)
+        transitions: Structured NumPy array of (source, target, probability) records
     """
-    # Read the file content
-    with open(file_path, 'r') as file:
-        content = file.read()
-    
-    # Process the DOT file line by line to properly distinguish nodes from edges
-    lines = content.split(';')
-    
     nodes = {}
-    transitions = []
     
-    for line in lines:
-        line = line.strip()
+    # Scan the memory-mapped file directly; only the captured groups are decoded
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return nodes, np.empty(0, dtype=_TRANSITION_DTYPE)
         
-        # Skip empty lines
-        if not line:
-            continue
-            
-        # Check if this is a node definition (doesn't contain "->")
-        if "->" not in line and "label=" in line:
-            # Extract node ID and label
-            node_match = re.search(r's(\d+)\s+\[label="([^"]*)"\]', line)
-            if node_match:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            # Extract node IDs and labels
+            for node_match in _NODE_DEF_BRE.finditer(content):
                 node_id = int(node_match.group(1))
-                label = node_match.group(2)
+                label = node_match.group(2).decode()
                 nodes[node_id] = label
-        
-        # Check if this is an edge definition (contains "->")
-        elif "->" in line and "label=" in line:
-            # Extract source, target, and probability
-            edge_match = re.search(r's(\d+)\s+->\s+s(\d+)\s+\[label="run:([0-9.]+)"\]', line)
-            if edge_match:
-                source = int(edge_match.group(1))
-                target = int(edge_match.group(2))
-                probability = float(edge_match.group(3))
-                transitions.append((source, target, probability))
+            
+            # Extract source, target, and probability of each edge in one NumPy sweep
+            transitions = np.fromregex(content, _EDGE_LABEL_BRE, _TRANSITION_DTYPE)
     
     return nodes, transitions
 
@@ -128,24 +120,38 @@ def create_transition_matrix(nodes, transitions):
     
     Args:
         nodes: Dictionary mapping node IDs to labels
-        transitions: List of tuples (source, target, probability)
+        transitions: Structured array from parse_dot_file, or list of tuples (source, target, probability)
         
     Returns:
-        matrix: NumPy array representing the transition probability matrix
+        matrix: SciPy CSR matrix representing the transition probability matrix
         node_ids: List of node IDs in the order they appear in the matrix
     """
     # Get the maximum node ID
     max_node_id = max(nodes.keys())
-    
-    # Initialize the transition matrix with zeros
-    matrix = np.zeros((max_node_id + 1, max_node_id + 1))
-    
-    # Fill in the transition probabilities
-    for source, target, probability in transitions:
-        matrix[source, target] = probability
+    n_states = max_node_id + 1
+    
+    # Split the transitions into source, target and probability arrays
+    if isinstance(transitions, np.ndarray) and transitions.dtype.names:
+        sources = transitions["source"].astype(np.intp, copy=False)
+        targets = transitions["target"].astype(np.intp, copy=False)
+        probabilities = transitions["probability"]
+    else:
+        transition_array = np.asarray(transitions, dtype=np.float64).reshape(-1, 3)
+        sources = transition_array[:, 0].astype(np.intp)
+        targets = transition_array[:, 1].astype(np.intp)
+        probabilities = transition_array[:, 2]
+    
+    # COO would sum repeated (source, target) pairs; keep the last one listed instead
+    _, last_reversed = np.unique((sources * n_states + targets)[::-1], return_index=True)
+    keep = len(sources) - 1 - last_reversed
+    
+    # Only the listed transitions are stored (MDP matrices are overwhelmingly sparse)
+    matrix = coo_matrix((probabilities[keep], (sources[keep], targets[keep])),
+                        shape=(n_states, n_states)).tocsr()
+    matrix.eliminate_zeros()
     
     # Create list of node IDs in order
-    node_ids = list(range(max_node_id + 1))
+    node_ids = list(range(n_states))
     
     return matrix, node_ids
 
@@ -154,14 +160,21 @@ def save_matrix_to_csv(matrix, output_file):
     Save the transition matrix to a CSV file.
     
     Args:
-        matrix: NumPy array representing the transition probability matrix
+        matrix: NumPy array or SciPy sparse matrix representing the transition probability matrix
         output_file: Path to save the CSV file
     """
-    # Create a DataFrame from the matrix
-    df = pd.DataFrame(matrix)
-    
-    # Save to CSV
-    df.to_csv(output_file)
+    # CSV is a dense format, so sparse matrices are expanded here
+    if issparse(matrix):
+        matrix = matrix.toarray()
+    
+    # Write the rows directly, keeping the index column and header row that
+    # pandas.read_csv(output_file, index_col=0) expects. Values are written with
+    # repr, as pandas does, so they round-trip exactly and always read back as
+    # floats (1.0 rather than 1, even for a deterministic MDP).
+    with open(output_file, 'w') as f:
+        f.write("," + ",".join(map(str, range(matrix.shape[1]))) + "\n")
+        for row_index, row in enumerate(np.asarray(matrix, dtype=np.float64).tolist()):
+            f.write(f"{row_index}," + ",".join(map(repr, row)) + "\n")
     print(f"Transition matrix saved to {output_file}")
 
 def save_node_labels(nodes, output_file):
@@ -172,8 +185,9 @@ def save_node_labels(nodes, output_file):
         nodes: Dictionary mapping node IDs to labels
         output_file: Path to save the labels file
     """
+    # Build the whole file in memory and write it in one call
+    lines = [f"Node {node_id}: {nodes[node_id]}\n" for node_id in sorted(nodes.keys())]
     with open(output_file, 'w', encoding='utf-8') as f:
-        for node_id in sorted(nodes.keys()):
-            f.write(f"Node {node_id}: {nodes[node_id]}\n")
+        f.write("".join(lines))
     
     print(f"Node labels saved to {output_file}")
@@ -1,7 +1,83 @@
+import sys
+
+import numpy as np
+from numba import njit
+
 from truck import Truck
 from client import Client
 from machine import Machine
 
+# Names of the entries of the state tuple returned by System.get_state()
+_COMPONENT_NAMES = (
+    "client_current_priority",
+    "quantity_shipped_to_the_client",
+    "time_to_penalty",
+    "m1_status",
+    "m1_stored",
+    "m1_to_completion",
+    "m2_status",
+    "m2_stored",
+    "m2_to_completion",
+    "ts_status",
+    "ts_to_completion",
+    "tb_status",
+    "tb_to_completion"
+)
+
+# Names of everything enact_strategy() can report: the state tuple followed by
+# the strategy decision variables, in output order
+_STRATEGY_COMPONENT_NAMES = _COMPONENT_NAMES + (
+    "command_executed",
+    "current_revenue",
+    "m1_running",
+    "m2_running",
+    "ts_running",
+    "tb_running",
+    "m1_maintenance_active",
+    "m2_maintenance_active",
+    "processing_m2_amount",
+    "shipped_m2_amount",
+    "client_quantity",
+    "total_material"
+)
+
+# Components reported by enact_strategy() when none are selected
+_BASE_COMPONENTS = frozenset(_COMPONENT_NAMES)
+
+# String form of the state tuple used by System.action(repr=True): statuses and
+# quantities (shown with two decimals) are quoted, integer times are not
+_STATE_FMT = (
+    "{{client_current_priority:'{0}', quantity_shipped_to_the_client:'{1:.2f}', "
+    "time_to_penalty:{2}, m1_status:'{3}', m1_stored:'{4:.2f}', m1_to_completion:{5}, "
+    "m2_status:'{6}', m2_stored:'{7:.2f}', m2_to_completion:{8}, ts_status:'{9}', "
+    "ts_to_completion:{10}, tb_status:'{11}', tb_to_completion:{12}}}"
+)
+
+# Status of a processing machine by batch size, so get_state() reuses one interned string
+_PROC_LOOKUP = {
+    batch_size: sys.intern(f"processing_{batch_size}") for batch_size in ("full", "half", "third")
+}
+
+# Integer codes of the string entries of the state tuple, used by System.get_state_int()
+_PRIORITY_CODES = {"none": 0, "low": 1, "medium": 2, "high": 3}
+_MACHINE_STATUS_CODES = {
+    "idle": 0, "maintenance": 1,
+    "processing_third": 2, "processing_half": 3, "processing_full": 4
+}
+_TRUCK_STATUS_CODES = {
+    "idle": 0, "shipping_zero": 1,
+    "shipping_third": 2, "shipping_half": 3, "shipping_full": 4
+}
+
+@njit(cache=True)
+def _quantize_sixths(value):
+    """Number of whole sixths in a value clamped between 0 and 1 (0 to 6)"""
+    if value <= 0:
+        return 0
+    if value >= 1:
+        return 6
+    return int(value * 6)
+
 class System:
     """
     A fixed system with exactly two machines, two trucks, and one client for 
@@ -45,12 +121,21 @@ class System:
         self.trucks = [self.small_truck, self.big_truck]
 
         self.current_enacted_strategy = 0
+        
+        # Cached result of get_state(), cleared whenever an action may change a component
+        self._state_cache = None
+        
+        # Action strings mapped to bound methods, built once for action()
+        self._actions = {name: getattr(self, name) for name in self.alphabet() + ["reset"]}
         self.m1_processing_full()
 
     def get_state(self):
         """
         Returns the current state of the system as a tuple.
         
+        The tuple is cached until the next action that may change a component, so
+        components modified directly (outside the System methods) are not reflected.
+        
         Values representing quantities are discretized to the set {0/6, 1/6, 2/6, 3/6, 4/6, 5/6, 6/6},
         with intermediate values rounded down to the nearest discrete value.
         
@@ -71,67 +156,63 @@ class System:
                 tb_to_completion
             )
         """
-        # Helper function to quantize values to multiples of 1/6
-        def quantize(value):
-            """Convert a value to the nearest lower multiple of 1/6 between 0 and 1"""
-            # Ensure value is between 0 and 1
-            value = max(0, min(1, value))
-            # Convert to sixths (0/6, 1/6, 2/6, ..., 6/6)
-            sixths = int(value * 6)
-            return sixths / 6
+        if self._state_cache is not None:
+            return self._state_cache
+        
+        # Component attributes are read directly; their get_state() dicts are not needed here
+        client = self.client
+        m1 = self.m1
+        m2 = self.m2
+        small_truck = self.small_truck
+        big_truck = self.big_truck
         
         # Client state
-        client_state = self.client.get_state()
-        client_priority = client_state["priority"] if client_state["priority"] else "none"
-        quantity_shipped = quantize(client_state["order_quantity"])
+        client_priority = client.current_priority if client.current_priority else "none"
+        quantity_shipped = _quantize_sixths(client.order_quantity) / 6
         
         # Calculate time to penalty
-        if client_state["state"] in ["order_placed", "wait_for_completion"]:
-            time_to_penalty = max(0, client_state["time_limit"] - client_state["time_passed"])
+        if client.state in ["order_placed", "wait_for_completion"]:
+            time_to_penalty = max(0, client.time_limit - client.time_passed)
             # If penalty has already started
-            if client_state["time_passed"] > client_state["time_limit"]:
+            if client.time_passed > client.time_limit:
                 time_to_penalty = -1
         else:
             # No active order
             time_to_penalty = -1
         
         # Machine 1 state
-        m1_state = self.m1.get_state()
-        if m1_state["state"] == "processing":
-            m1_status = f"processing_{m1_state['current_batch_size']}"
-            m1_to_completion = m1_state["time_remaining"]
+        if m1.state == "processing":
+            m1_status = _PROC_LOOKUP[m1.current_batch_size]
+            m1_to_completion = m1.time_remaining
         else:
-            m1_status = m1_state["state"]  # idle or maintenance
+            m1_status = m1.state  # idle or maintenance
             m1_to_completion = 0
-        m1_stored = quantize(m1_state["stored_output"])
+        m1_stored = _quantize_sixths(m1.stored_output) / 6
         
         # Machine 2 state
-        m2_state = self.m2.get_state()
-        if m2_state["state"] == "processing":
-            m2_status = f"processing_{m2_state['current_batch_size']}"
-            m2_to_completion = m2_state["time_remaining"]
+        if m2.state == "processing":
+            m2_status = _PROC_LOOKUP[m2.current_batch_size]
+            m2_to_completion = m2.time_remaining
         else:
-            m2_status = m2_state["state"]  # idle or maintenance
+            m2_status = m2.state  # idle or maintenance
             m2_to_completion = 0
-        m2_stored = quantize(m2_state["stored_output"])
+        m2_stored = _quantize_sixths(m2.stored_output) / 6
         
         # Small truck state
-        ts_state = self.small_truck.get_state()
-        if ts_state["state"] == "delivering":
-            if ts_state["current_load"] == 0:
+        if small_truck.state == "delivering":
+            if small_truck.current_load == 0:
                 ts_status = "shipping_zero"
             else:
                 # Small truck can only carry up to 1/3
                 ts_status = "shipping_third"
-            ts_to_completion = ts_state["time_remaining"]
+            ts_to_completion = small_truck.time_remaining
         else:
             ts_status = "idle"
             ts_to_completion = 0
         
         # Big truck state
-        tb_state = self.big_truck.get_state()
-        if tb_state["state"] == "delivering":
-            load = quantize(tb_state["current_load"])
+        if big_truck.state == "delivering":
+            load = _quantize_sixths(big_truck.current_load) / 6
             if load == 0:
                 tb_status = "shipping_zero"
             elif load <= 1/3:
@@ -140,13 +221,13 @@ class System:
                 tb_status = "shipping_half"
             else:
                 tb_status = "shipping_full"
-            tb_to_completion = tb_state["time_remaining"]
+            tb_to_completion = big_truck.time_remaining
         else:
             tb_status = "idle"
             tb_to_completion = 0
         
-        # Construct and return the tuple
-        return (
+        # Construct, cache and return the tuple
+        self._state_cache = (
             client_priority,
             quantity_shipped,
             time_to_penalty,
@@ -161,15 +242,45 @@ class System:
             tb_status,
             tb_to_completion
         )
+        return self._state_cache
+
+    def get_state_int(self):
+        """
+        Returns the current state of the system as an array of small integers,
+        suitable as a compact, hashable key (e.g. via tobytes()).
+        
+        Entries follow the order of get_state(); statuses and the priority are
+        replaced by integer codes and quantities by their number of sixths (0 to 6).
+        Times saturate at the int8 range (a truck holding a refused delivery keeps
+        counting down).
+        
+        Returns:
+            np.ndarray: Array of 13 np.int8 values
+        """
+        state = self.get_state()
+        return np.array([
+            _PRIORITY_CODES[state[0]],
+            round(state[1] * 6),
+            state[2],
+            _MACHINE_STATUS_CODES[state[3]],
+            round(state[4] * 6),
+            state[5],
+            _MACHINE_STATUS_CODES[state[6]],
+            round(state[7] * 6),
+            state[8],
+            _TRUCK_STATUS_CODES[state[9]],
+            state[10],
+            _TRUCK_STATUS_CODES[state[11]],
+            state[12]
+        ]).clip(-128, 127).astype(np.int8)
+
     def m1_processing_third(self):
         """
         Request Machine 1 to process a third of a batch.
         Returns the system state regardless of success.
         """
-        try:
-            self.m1.request_processing(batch_size="third")
-        except Exception:
-            pass
+        if self.m1.request_processing(batch_size="third"):
+            self._state_cache = None
         return self.get_state()
 
     def m1_processing_half(self):
@@ -177,10 +288,8 @@ class System:
         Request Machine 1 to process half of a batch.
         Returns the system state regardless of success.
         """
-        try:
-            self.m1.request_processing(batch_size="half")
-        except Exception:
-            pass
+        if self.m1.request_processing(batch_size="half"):
+            self._state_cache = None
         return self.get_state()
 
     def m1_processing_full(self):
@@ -188,10 +297,8 @@ class System:
         Request Machine 1 to process a full batch.
         Returns the system state regardless of success.
         """
-        try:
-            self.m1.request_processing(batch_size="full")
-        except Exception:
-            pass
+        if self.m1.request_processing(batch_size="full"):
+            self._state_cache = None
         return self.get_state()
 
     def m1_maintenance(self):
@@ -199,10 +306,8 @@ class System:
         Request maintenance for Machine 1.
         Returns the system state regardless of success.
         """
-        try:
-            self.m1.request_maintenance()
-        except Exception:
-            pass
+        if self.m1.request_maintenance():
+            self._state_cache = None
         return self.get_state()
 
     def m2_processing_third(self):
@@ -210,10 +315,9 @@ class System:
         Request Machine 2 to process a third of a batch.
         Returns the system state regardless of success.
         """
-        try:
-            self.m2.request_processing(batch_size="third")
-        except Exception:
-            pass
+        self.m2.request_processing(batch_size="third")
+        # Even a refused request may have drawn material from M1
+        self._state_cache = None
         return self.get_state()
 
     def m2_processing_half(self):
@@ -221,10 +325,9 @@ class System:
         Request Machine 2 to process half of a batch.
         Returns the system state regardless of success.
         """
-        try:
-            self.m2.request_processing(batch_size="half")
-        except Exception:
-            pass
+        self.m2.request_processing(batch_size="half")
+        # Even a refused request may have drawn material from M1
+        self._state_cache = None
         return self.get_state()
 
     def m2_processing_full(self):
@@ -232,10 +335,9 @@ class System:
         Request Machine 2 to process a full batch.
         Returns the system state regardless of success.
         """
-        try:
-            self.m2.request_processing(batch_size="full")
-        except Exception:
-            pass
+        self.m2.request_processing(batch_size="full")
+        # Even a refused request may have drawn material from M1
+        self._state_cache = None
         return self.get_state()
 
     def m2_maintenance(self):
@@ -243,10 +345,8 @@ class System:
         Request maintenance for Machine 2.
         Returns the system state regardless of success.
         """
-        try:
-            self.m2.request_maintenance()
-        except Exception:
-            pass
+        if self.m2.request_maintenance():
+            self._state_cache = None
         return self.get_state()
 
     def small_truck_shipment(self):
@@ -254,10 +354,8 @@ class System:
         Request the small truck to make a shipment.
         Returns the system state regardless of success.
         """
-        try:
-            self.small_truck.request_shipment()
-        except Exception:
-            pass
+        if self.small_truck.request_shipment():
+            self._state_cache = None
         return self.get_state()
 
     def big_truck_shipment(self):
@@ -265,10 +363,8 @@ class System:
         Request the big truck to make a shipment.
         Returns the system state regardless of success.
         """
-        try:
-            self.big_truck.request_shipment()
-        except Exception:
-            pass
+        if self.big_truck.request_shipment():
+            self._state_cache = None
         return self.get_state()
 
     def step(self):
@@ -276,26 +372,18 @@ class System:
         Advance all components by one time unit.
         Returns the system state after advancement.
         """
-        # Step all machines
-        for machine in self.machines:
-            try:
-                machine.step()
-            except Exception:
-                pass
+        # Step both machines (the configuration is fixed, so no list iteration)
+        self.m1.step()
+        self.m2.step()
         
-        # Step all trucks
-        for truck in self.trucks:
-            try:
-                truck.step()
-            except Exception:
-                pass
+        # Step both trucks (a delivery the client refuses keeps the truck delivering)
+        self.small_truck.try_step()
+        self.big_truck.try_step()
         
         # Step client
-        try:
-            self.client.step_time()
-        except Exception:
-            pass
+        self.client.step_time()
         
+        self._state_cache = None
         return self.get_state()
 
     def reset(self):
@@ -304,33 +392,22 @@ class System:
         Returns the system state after reset.
         """
         self.current_enacted_strategy = 0
+        self._state_cache = None
 
         # Reset client
-        try:
-            self.client.reset()
-        except Exception:
-            pass
+        self.client.reset()
         
         # Reset all machines
         for machine in self.machines:
-            try:
-                machine.reset()
-            except Exception:
-                pass
+            machine.reset()
         
         # Reset all trucks
         for truck in self.trucks:
-            try:
-                truck.reset()
-            except Exception:
-                pass
-        
-        # Place new order
-        try:
-            self.current_priority = self.client.place_order()
-            self.m1_processing_full() # Start processing immediately
-        except Exception:
-            pass
+            truck.reset()
+        
+        # Place new order (the client is idle after its reset)
+        self.current_priority = self.client.place_order()
+        self.m1_processing_full() # Start processing immediately
         
         return self.get_state()
 
@@ -348,66 +425,14 @@ class System:
         Returns:
             The result of the called method (system state or its string representation)
         """
-        # Dictionary mapping action strings to methods
-        action_methods = {
-            "m1_processing_third": self.m1_processing_third,
-            "m1_processing_half": self.m1_processing_half,
-            "m1_processing_full": self.m1_processing_full,
-            "m1_maintenance": self.m1_maintenance,
-            "m2_processing_third": self.m2_processing_third,
-            "m2_processing_half": self.m2_processing_half,
-            "m2_processing_full": self.m2_processing_full,
-            "m2_maintenance": self.m2_maintenance,
-            "small_truck_shipment": self.small_truck_shipment,
-            "big_truck_shipment": self.big_truck_shipment,
-            "step": self.step,
-            "reset": self.reset
-        }
-        
         # Call the corresponding method if it exists
-        if action_str in action_methods:
-            state = action_methods[action_str]()
+        action_method = self._actions.get(action_str)
+        if action_method is not None:
+            state = action_method()
             
             # If repr=True, format the state as a string
             if repr:
-                # Define the component names
-                component_names = [
-                    "client_current_priority", 
-                    "quantity_shipped_to_the_client",
-                    "time_to_penalty",
-                    "m1_status", 
-                    "m1_stored",
-                    "m1_to_completion",
-                    "m2_status", 
-                    "m2_stored",  
-                    "m2_to_completion",
-                    "ts_status",
-                    "ts_to_completion",
-                    "tb_status",
-                    "tb_to_completion"
-                ]
-                
-                # Create formatted string with key:value pairs
-                state_dict = {}
-                for i, name in enumerate(component_names):
-                    value = state[i]
-                    # Format floats to two decimal places
-                    if isinstance(value, float):
-                        state_dict[name] = f"{value:.2f}"
-                    else:
-                        state_dict[name] = value
-                
-                # Convert dict to string format: {key1:value1, key2:value2, ...}
-                result = "{"
-                for idx, (key, value) in enumerate(state_dict.items()):
-                    if isinstance(value, str):
-                        result += f"{key}:'{value}'"
-                    else:
-                        result += f"{key}:{value}"
-                    if idx < len(state_dict) - 1:
-                        result += ", "
-                result += "}"
-                return result
+                return _STATE_FMT.format(*state)
             
             return state
         else:
@@ -476,14 +501,7 @@ class System:
         tb_running = tb_status != "available"
         
         # Calculate processing amounts
-        processing_m2_amount = 0
-        if m2_status.startswith("processing"):
-            if "full" in m2_status:
-                processing_m2_amount = 1
-            elif "half" in m2_status:
-                processing_m2_amount = 0.5
-            elif "third" in m2_status:
-                processing_m2_amount = 1/3
+        processing_m2_amount = self.m2.current_batch_fraction
         
         # Calculate shipped amounts (in transit)
         shipped_m2_amount = 0
@@ -529,82 +547,38 @@ class System:
         # Execute the selected command
         state = self.action(command, repr=False)
         
-        # Get current revenue
-        client_state = self.client.get_state()
-        current_revenue = client_state["current_payment"]
-        
-        # Define all possible components
-        all_components = {
-            # Base state components
-            "client_current_priority": state[0],
-            "quantity_shipped_to_the_client": state[1],
-            "time_to_penalty": state[2],
-            "m1_status": state[3],
-            "m1_stored": state[4],
-            "m1_to_completion": state[5],
-            "m2_status": state[6],
-            "m2_stored": state[7],
-            "m2_to_completion": state[8],
-            "ts_status": state[9],
-            "ts_to_completion": state[10],
-            "tb_status": state[11],
-            "tb_to_completion": state[12],
-            
-            # Strategy decision variables
-            "command_executed": command,
-            "current_revenue": current_revenue,
-            "m1_running": m1_running,
-            "m2_running": m2_running,
-            "ts_running": ts_running,
-            "tb_running": tb_running,
-            "m1_maintenance_active": m1_maintenance_active,
-            "m2_maintenance_active": m2_maintenance_active,
-            "processing_m2_amount": processing_m2_amount,
-            "shipped_m2_amount": shipped_m2_amount,
-            "client_quantity": client_quantity,
-            "total_material": total_material
-        }
-        
-        # Format values
-        formatted_components = {}
-        for key, value in all_components.items():
-            if isinstance(value, float):
-                formatted_components[key] = f"{value:.2f}"
-            else:
-                formatted_components[key] = value
+        # All values in the order of _STRATEGY_COMPONENT_NAMES
+        values = state + (
+            command,
+            self.client.current_payment,
+            m1_running,
+            m2_running,
+            ts_running,
+            tb_running,
+            m1_maintenance_active,
+            m2_maintenance_active,
+            processing_m2_amount,
+            shipped_m2_amount,
+            client_quantity,
+            total_material
+        )
         
-        # Filter components if requested
-        if selected_components is not None:
-            formatted_components = {k: v for k, v in formatted_components.items() if k in selected_components}
+        # Default to include only base components
+        if selected_components is None:
+            wanted = _BASE_COMPONENTS
         else:
-            # Default to include only base components
-            base_components = [
-                "client_current_priority",
-                "quantity_shipped_to_the_client",
-                "time_to_penalty",
-                "m1_status", 
-                "m1_stored",
-                "m1_to_completion",
-                "m2_status", 
-                "m2_stored",  
-                "m2_to_completion",
-                "ts_status",
-                "ts_to_completion",
-                "tb_status",
-                "tb_to_completion"
-            ]
-            formatted_components = {k: v for k, v in formatted_components.items() if k in base_components}
-        
-        # Convert to string format
-        result = "{"
-        items = list(formatted_components.items())
-        for idx, (key, value) in enumerate(items):
+            wanted = frozenset(selected_components)
+        
+        # Format and convert to string format only the requested components
+        items = []
+        for key, value in zip(_STRATEGY_COMPONENT_NAMES, values):
+            if key not in wanted:
+                continue
+            if isinstance(value, float):
+                value = f"{value:.2f}"
             if isinstance(value, str) and not value.replace('.', '', 1).isdigit():
-                result += f"{key}:'{value}'"
+                items.append(f"{key}:'{value}'")
             else:
-                result += f"{key}:{value}"
-            if idx < len(items) - 1:
-                result += ", "
-        result += "}"
+                items.append(f"{key}:{value}")
         
-        return result
\ No newline at end of file
+        return "{" + ", ".join(items) + "}"
\ No newline at end of file
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from fleet import Fleet
+from machine import Machine
+from client import Client
+from truck import AVAILABLE, DELIVERING
+
+
+def make_machine(stored_output):
+    machine = Machine("M2")
+    machine.stored_output = stored_output
+    return machine
+
+
+def test_client_ids_out_of_range_are_rejected():
+    client = Client()
+    with pytest.raises(ValueError):
+        Fleet([0.5, 0.5], 1, client_ids=[0, 5], clients=[client])
+    with pytest.raises(ValueError):
+        Fleet([0.5, 0.5], 1, client_ids=[0, -1], n_clients=2)
+
+
+def test_client_ids_must_match_trucks():
+    with pytest.raises(ValueError):
+        Fleet([0.5, 0.5], 1, client_ids=[0])
+    with pytest.raises(ValueError):
+        Fleet([0.5], 1, n_clients=2, clients=[Client()])
+
+
+def test_step_compacts_delivering_trucks_and_lists_deliveries():
+    fleet = Fleet([1.0, 1.0, 1.0, 1.0], [1, 3, 2, 3], client_ids=[0, 1, 0, 1])
+    np.testing.assert_array_equal(fleet.request_shipments(make_machine(10)), [0, 1, 2, 3])
+
+    np.testing.assert_array_equal(fleet.step(), [0])
+    assert fleet.n_delivering == 3
+    np.testing.assert_array_equal(fleet.delivering[:fleet.n_delivering], [1, 2, 3])
+
+    np.testing.assert_array_equal(fleet.step(), [2])
+    np.testing.assert_array_equal(fleet.delivering[:fleet.n_delivering], [1, 3])
+
+    np.testing.assert_array_equal(fleet.step(), [1, 3])
+    assert fleet.n_delivering == 0
+    assert len(fleet.step()) == 0
+
+    np.testing.assert_array_equal(fleet.state, [AVAILABLE] * 4)
+    np.testing.assert_array_equal(fleet.current_load, [0.0] * 4)
+    np.testing.assert_array_equal(fleet.shipped, [2.0, 2.0])
+
+
+def test_step_leaves_unfinished_trucks_loaded():
+    fleet = Fleet([0.5, 1.0], [1, 2])
+    fleet.request_shipments(make_machine(10))
+    fleet.step()
+
+    np.testing.assert_array_equal(fleet.state, [AVAILABLE, DELIVERING])
+    np.testing.assert_array_equal(fleet.current_load, [0.0, 1.0])
+    np.testing.assert_array_equal(fleet.time_remaining, [0, 1])
+    np.testing.assert_array_equal(fleet.shipped, [0.5])
+
+
+def test_request_shipments_ignores_float_residue():
+    # Six thirds drain a stock of 2.0 up to a float residue of about 1e-16
+    fleet = Fleet([1/3] * 7, 1)
+    machine = make_machine(2.0)
+    np.testing.assert_array_equal(fleet.request_shipments(machine), [0, 1, 2, 3, 4, 5])
+    assert fleet.state[6] == AVAILABLE
+    assert fleet.current_load[6] == 0
+
+
+def test_sync_clients_reports_what_the_order_accepts():
+    client = Client()
+    client.place_order()
+    fleet = Fleet([1/3] * 4, 2, clients=[client])
+    fleet.request_shipments(make_machine(2.0))
+    fleet.step()
+    fleet.step()
+
+    # Four thirds were delivered at once: the order is completed, the rest stays pending
+    assert client.state == "completed"
+    assert client.order_quantity == 1.0
+    assert fleet.shipped[0] - fleet.reported[0] == pytest.approx(1/3)
+
+    client.reset()
+    client.place_order()
+    fleet.sync_clients()
+    assert client.order_quantity == pytest.approx(1/3)
+    assert fleet.reported[0] == fleet.shipped[0]
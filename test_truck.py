@@ -0,0 +1,54 @@
+import copy
+
+import pytest
+
+from machine import Machine
+from truck import Truck
+
+
+def test_get_state_reflects_fields_set_directly():
+    truck = Truck(1.0, 3)
+    truck.get_state()
+    truck.current_load = 0.5
+    truck.time_remaining = 2
+    truck.state = "delivering"
+
+    state = truck.get_state()
+    assert state["current_load"] == 0.5
+    assert state["time_remaining"] == 2
+    assert state["state"] == "delivering"
+
+
+def test_copied_truck_ships_for_itself():
+    machine = Machine("M2")
+    machine.stored_output = 2.0
+    truck = Truck(1.0, 3)
+    truck.set_client(object())
+    truck.set_machine(machine)
+
+    clone = copy.copy(truck)
+    assert clone.request_shipment()
+    assert clone.state == "delivering"
+    assert truck.state == "available"
+
+
+def test_obtain_reuses_released_truck_in_place():
+    truck = Truck(1.0, 3, name="Big")
+    state_view = truck._state_view
+    truck.current_load = 0.5
+    truck.release()
+
+    reused = Truck.obtain(1/3, 2)
+    assert reused is truck
+    assert reused._state_view is state_view
+    assert reused.get_state() == Truck(1/3, 2).get_state()
+    assert not reused.request_shipment()
+
+
+def test_release_twice_raises():
+    truck = Truck(1.0, 3)
+    truck.release()
+    with pytest.raises(ValueError):
+        truck.release()
+    assert Truck.obtain(1.0, 3) is truck
+    assert Truck.obtain(1.0, 3) is not truck
@@ -1,8 +1,30 @@
+from collections import deque
+from functools import lru_cache
+
+# Truck states, stored as small integers (Truck.state exposes their names)
+AVAILABLE = 0
+DELIVERING = 1
+STATE_NAMES = ("available", "delivering")
+
+# Released trucks waiting to be reused by obtain(), one pool per truck class
+_truck_pools = {}
+
+@lru_cache(maxsize=8)
+def _default_name(capacity):
+    """Default name of a truck (only a handful of distinct capacities are used)"""
+    return f"Truck-{capacity}"
+
 class Truck:
     """
     Class representing a truck for shipping goods.
     Supports both small and big trucks with different capacities and delivery times.
     """
+    __slots__ = (
+        "capacity", "time_to_deliver", "name", "_state", "current_load",
+        "time_remaining", "client", "source_machine", "_state_view",
+        "_ready", "_released"
+    )
+    
     def __init__(self, capacity, time_to_deliver, name=None):
         """
         Initialize a truck with specific capacity and delivery time.
@@ -15,32 +37,95 @@ class Truck:
         """
         self.capacity = capacity
         self.time_to_deliver = time_to_deliver
-        self.name = name or f"Truck-{capacity}"
+        self.name = name or _default_name(capacity)
         
         # State tracking
-        self.state = "available"  # available, loading, delivering, returning
+        self._state = AVAILABLE  # AVAILABLE or DELIVERING
+        self.current_load = 0
+        self.time_remaining = 0
+        self.client = None
+        self.source_machine = None
+        self._ready = False  # True once both the client and the machine are linked
+        self._released = False  # True while waiting in the pool for obtain()
+        
+        # Template of the get_state() dict; name and capacity only change in _reinit
+        self._state_view = {
+            "name": self.name,
+            "state": self.state,
+            "capacity": self.capacity,
+            "current_load": self.current_load,
+            "time_remaining": self.time_remaining
+        }
+    
+    @classmethod
+    def obtain(cls, capacity, time_to_deliver, name=None):
+        """
+        Return a truck initialized like Truck(capacity, time_to_deliver, name),
+        reusing a released truck when one is available.
+        """
+        truck_pool = _truck_pools.get(cls)
+        if truck_pool:
+            truck = truck_pool.pop()
+            truck._reinit(capacity, time_to_deliver, name)
+            return truck
+        return cls(capacity, time_to_deliver, name)
+    
+    def _reinit(self, capacity, time_to_deliver, name):
+        """Reset a released truck in place, reusing its get_state() template"""
+        self.capacity = capacity
+        self.time_to_deliver = time_to_deliver
+        self.name = name or _default_name(capacity)
+        
+        # release() already unlinked the client and the machine
+        self._state = AVAILABLE
         self.current_load = 0
         self.time_remaining = 0
+        self._released = False
+        
+        state_view = self._state_view
+        state_view["name"] = self.name
+        state_view["capacity"] = capacity
+    
+    def release(self):
+        """
+        Hand the truck back for reuse by obtain() (e.g. at the end of a replication).
+        The truck must not be used afterwards, and can only be released once.
+        """
+        if self._released:
+            raise ValueError(f"Truck {self.name} has already been released")
+        
         self.client = None
         self.source_machine = None
+        self._ready = False
+        self._released = True
+        _truck_pools.setdefault(type(self), deque()).append(self)
+    
+    @property
+    def state(self):
+        """Name of the current state ("available" or "delivering")"""
+        return STATE_NAMES[self._state]
+    
+    @state.setter
+    def state(self, name):
+        self._state = STATE_NAMES.index(name)
     
     def set_client(self, client):
         """Link this truck to a client that will receive shipments"""
         self.client = client
+        self._ready = self.client is not None and self.source_machine is not None
         
     def set_machine(self, machine):
         """Link this truck to a machine that will be the source of products"""
         self.source_machine = machine
+        self._ready = self.client is not None and self.source_machine is not None
     
     def request_shipment(self):
         """
         Attempt to start a shipment if the truck is available.
         Returns True if shipment started, False otherwise.
         """
-        if self.state != "available":
-            return False
-            
-        if not self.source_machine or not self.client:
+        # A truck can only ship once linked to both a machine and a client
+        if self._state != AVAILABLE or not self._ready:
             return False
             
         # Retrieve product from the machine (up to capacity)
@@ -51,7 +136,7 @@ class Truck:
             
         # Start shipment
         self.current_load = retrieved_quantity
-        self.state = "delivering"
+        self._state = DELIVERING
         self.time_remaining = self.time_to_deliver
         return True
     
@@ -59,40 +144,64 @@ class Truck:
         """
         Advance the truck's state by one time unit.
         Returns True if the truck performed a delivery during this step.
+        
+        Meant for individual trucks; large fleets are advanced together by
+        Fleet.step (fleet.advance_fleet) without a method call per truck.
         """
         delivery_completed = False
         
-        if self.state == "delivering":
+        if self._state == DELIVERING:
             self.time_remaining -= 1
             
             if self.time_remaining <= 0:
-                # Delivery complete, transfer goods to client
-                if self.client:
-                    self.client.quantity_shipped(self.current_load)
-                
-                # Reset truck state
-                self.state = "available"
-                self.current_load = 0
+                self.complete_delivery()
                 delivery_completed = True
         
         return delivery_completed
     
+    def complete_delivery(self):
+        """
+        Transfer the current load to the client and make the truck available again.
+        Used by step() when the delivery time runs out, and directly by event-driven
+        schedulers that do not count time down one unit at a time.
+        """
+        # Delivery complete, transfer goods to client
+        if self.client:
+            self.client.quantity_shipped(self.current_load)
+        
+        # Reset truck state
+        self._state = AVAILABLE
+        self.current_load = 0
+        self.time_remaining = 0
+    
+    def try_step(self):
+        """
+        Advance the truck's state by one time unit like step(), but a delivery
+        the client cannot accept leaves the truck delivering instead of raising.
+        Returns True if the truck performed a delivery during this step.
+        """
+        if (self._state == DELIVERING and self.time_remaining <= 1 and self.client
+                and not self.client.can_receive(self.current_load)):
+            self.time_remaining -= 1
+            return False
+        return self.step()
+    
     def get_state(self):
         """Return the current state of the truck"""
-        return {
-            "name": self.name,
-            "state": self.state,
-            "capacity": self.capacity,
-            "current_load": self.current_load,
-            "time_remaining": self.time_remaining
-        }
+        # Refresh the changing fields of the template and hand out a copy of it
+        # (current_load and time_remaining are public and may be set directly)
+        state_view = self._state_view
+        state_view["state"] = STATE_NAMES[self._state]
+        state_view["current_load"] = self.current_load
+        state_view["time_remaining"] = self.time_remaining
+        return state_view.copy()
     
     def is_available(self):
         """Check if the truck is available for a new shipment"""
-        return self.state == "available"
+        return self._state == AVAILABLE
     
     def reset(self):
         """Reset the truck to its initial state"""
-        self.state = "available"
+        self._state = AVAILABLE
         self.current_load = 0
         self.time_remaining = 0
\ No newline at end of file